@@ -0,0 +1,135 @@
+import gzip
+import json
+import sys
+from pathlib import Path
+from string import Template
+import jsons
+from generate_json import ProjectDir, InvalidProjectDirectory, InvalidProjectFile, find_project_dirs
+from util import status
+
+# Constants
+STDIO_FILE_NAME = "-"
+GZIP_SUFFIX = ".gz"
+EXTRA_JSON_SUFFIX = "_extra.json"
+
+# Open an NDJSON stream (a file, a gzipped file or stdin/stdout) for text I/O
+def open_ndjson(file_name, mode):
+    # Is this standard input/output?
+    if file_name == STDIO_FILE_NAME:
+        return open(sys.stdout.fileno() if mode == "w" else sys.stdin.fileno(), mode, encoding="utf-8", closefd=False)
+
+    # Is this a compressed file?
+    if file_name.endswith(GZIP_SUFFIX):
+        return gzip.open(file_name, mode + "t", encoding="utf-8")
+
+    return open(file_name, mode, encoding="utf-8")
+
+# Load the extra info (if any) for a project from the extra JSON directory
+def import_extra_json(project_file, extra_json_dir):
+    # Extra JSON files are named after the project (e.g. "MicDrums_extra.json")
+    extra_json_path = Path(extra_json_dir) / (project_file.project_name + EXTRA_JSON_SUFFIX)
+
+    # If there is no such file, there is nothing to import
+    if not extra_json_path.is_file():
+        return
+
+    # Open the extra JSON file for reading
+    with open(extra_json_path, "r", encoding="utf-8") as extra_json_file:
+        try:
+            # Enhance class
+            project_file.import_extra_info(jsons.loads(extra_json_file.read()))
+        except (KeyError, ValueError) as exp:
+            # Malformed (or incomplete) extra info
+            raise InvalidProjectFile(extra_json_path, Template('Invalid extra JSON file "$file" [$message]').substitute(file=extra_json_path, message=exp))
+
+# Walk the card roots, yielding each project directory path
+def find_card_project_dirs(card_roots, stream=sys.stderr):
+    # Loop through each of the cards...
+    for card_root in card_roots:
+        try:
+            yield from find_project_dirs(card_root)
+        except InvalidProjectDirectory as ipd:
+            # Diagnostics (skip this card, but keep going)
+            status(Template("Error [$message (skipped)]\n").substitute(message=ipd.message), stream)
+
+# Decode (and yield) one project at a time from the project directory paths
+def read_projects(project_dir_paths, extra_json_dir, stream=sys.stderr):
+    # Loop through each of the project directories
+    for project_dir_path in project_dir_paths:
+        # Diagnostics
+        status(Template('Reading "$project_dir"...').substitute(project_dir=project_dir_path), stream)
+
+        try:
+            # Get the Project Directory object...
+            project_dir = ProjectDir.read_directory(project_dir_path)
+
+            # Enhance with any extra info
+            import_extra_json(project_dir.project_file, extra_json_dir)
+        except (InvalidProjectDirectory, InvalidProjectFile) as ipd:
+            # Diagnostics (skip this project, but keep going)
+            status(Template("Error [$message (skipped)]\n").substitute(message=ipd.message), stream)
+            continue
+        except Exception as exp:
+            # Any other failure to read or decode a project (or its extra info) only skips that project, too
+            status(Template("Error [$message (skipped)]\n").substitute(message=exp), stream)
+            continue
+
+        # Without a card name from the extra info, use the card's directory name (so every project says where it came from)
+        if not project_dir.project_file.card_name:
+            project_dir.project_file.card_name = Path(project_dir_path).resolve().parent.name
+
+        # Diagnostics
+        status(Template('OK [$num_files files in Project "$name"]\n').substitute(num_files=project_dir.num_files, name=project_dir.project_file.project_name), stream)
+
+        yield project_dir.project_file
+
+# Walk the card roots, decoding (and yielding) one project at a time
+def iter_projects(card_roots, extra_json_dir, stream=sys.stderr):
+    return read_projects(find_card_project_dirs(card_roots, stream), extra_json_dir, stream)
+
+# Write each project as a single line of JSON, returning the number written
+def write_ndjson(project_files, output_file):
+    # Initialize a count of projects
+    num_projects = 0
+
+    # Only one project is ever held in memory at a time
+    for project_file in project_files:
+        # Write the JSON (one object per line)
+        output_file.write(jsons.dumps(project_file, strip_privates=True))
+        output_file.write("\n")
+
+        # Increment the number of projects written
+        num_projects += 1
+
+    return num_projects
+
+# Lazily iterate the JSON objects in an NDJSON stream (one line at a time)
+def read_ndjson(file_name):
+    with open_ndjson(file_name, "r") as input_file:
+        for line in input_file:
+            # Skip any blank lines
+            if line.strip():
+                yield json.loads(line)
+
+if __name__ == '__main__':
+    # Look for command line argument of file name...
+    if len(sys.argv[1:]) < 3:
+        # Status...
+        print("Missing arguments: OUTPUT_NDJSON_FILE EXTRA_JSON_DIR CARD_DIR [CARD_DIR ...]")
+    else:
+        # Diagnostics go to stderr, so that the output may be stdout ("-")
+        status(Template('Opening "$output_file" for writing NDJSON...\n').substitute(output_file=sys.argv[1]), sys.stderr)
+
+        try:
+            with open_ndjson(sys.argv[1], "w") as output_file:
+                # Stream each project to the output
+                num_projects = write_ndjson(iter_projects(sys.argv[3:], sys.argv[2]), output_file)
+
+            # Diagnostics
+            status(Template("OK [$num_projects projects written]\n").substitute(num_projects=num_projects), sys.stderr)
+        except Exception as exp:
+            # Diagnostics
+            status(Template("Error [$message]\n").substitute(message=exp), sys.stderr)
+
+            # Exit with a failure
+            sys.exit(1)
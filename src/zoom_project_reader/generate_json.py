@@ -1,3 +1,4 @@
+from io import BytesIO
 from pathlib import Path
 import re
 from os import scandir, listdir
@@ -177,18 +178,25 @@ class BinaryFile():
             # Return an instance of ourself
             return BinaryFile(contents)
 
+# An exception class that indicates an invalid project (or effects) file
+class InvalidProjectFile(Exception):
+    # Constructor
+    def __init__(self, file_name, message):
+        self.file_name = file_name
+        self.message = message
+
 # Define our Effects File class
 class EffectsFile(BinaryFile):
     # Constructor
-    def __init__(self, file_name):
-        # Use our zoomrlib library to read the file...
-        with zoomrlib.open(file_name, "r") as file:
-            # Load the file
-            self.efxdata = zoomrlib.effect.load(file)
+    def __init__(self, binary_array):
+        super().__init__(binary_array)
+
+        # Use our zoomrlib library to decode the file contents...
+        self.efxdata = zoomrlib.effect.load(BytesIO(binary_array))
 
-            # If not a valid file, get out now!
-            if not self.efxdata.valid_header:
-                raise Exception(Template('Unexpected Effects File [header_text="$header_text"]').substitute(header_text=self.efxdata.header))
+        # If not a valid file, get out now!
+        if not self.efxdata.valid_header:
+            raise InvalidProjectFile(EFFECTS_FILE_NAME, Template('Unexpected Effects File [header_text="$header_text"]').substitute(header_text=self.efxdata.header))
 
     # Retrieve reverb info
     def get_reverb_info(self):
@@ -229,10 +237,9 @@ class MasterTrack:
 # Define our Profile File class
 class ProjectFile:
     # Constructor
-    def __init__(self, project_number, file_name):
-        # Use our zoomrlib library to read the file...
-        with zoomrlib.open(file_name, "r") as file:
-            prjdata = zoomrlib.project.load(file)
+    def __init__(self, project_number, binary_array):
+        # Use our zoomrlib library to decode the file contents...
+        prjdata = zoomrlib.project.load(BytesIO(binary_array))
 
         # Record the project number
         self.project_number:str = str(project_number).zfill(3)
@@ -316,6 +323,21 @@ class InvalidProjectDirectory(Exception):
         self.dir_path = dir_path
         self.message = message
 
+# Define the (undecoded) contents of a Project Directory
+class ProjectDirContents():
+    # Constructor...
+    def __init__(self, dir_path, project_number, project_data, effects_data, audio_files, num_files):
+        self.dir_path = dir_path
+        self.project_number = project_number
+        self.project_data = project_data
+        self.effects_data = effects_data
+        self.audio_files = audio_files
+        self.num_files = num_files
+
+    # The number of bytes read from the project directory
+    def num_bytes(self):
+        return len(self.project_data) + len(self.effects_data)
+
 # Define our Project Directory class
 class ProjectDir():
     # Constructor...
@@ -328,6 +350,11 @@ class ProjectDir():
     # Class level method to read the contents of a project directory
     @classmethod
     def read_directory(cls, dir_path_str):
+        return cls.decode_contents(cls.read_contents(dir_path_str))
+
+    # Class level method to read (but not decode) the contents of a project directory
+    @classmethod
+    def read_contents(cls, dir_path_str):
         # Get the directory entry for this path
         dir_path = Path(dir_path_str)
 
@@ -346,8 +373,11 @@ class ProjectDir():
         # Get the project number
         project_number = int(match.group(1))
 
-        # Initialize a total count of files
+        # Initialize a total count of files (and the files we expect to find)
         num_files = 0
+        project_data = None
+        effects_data = None
+        audio_files = []
 
         # Loop through the top-level entries...
         for dir_entry in scandir(dir_path):
@@ -357,13 +387,13 @@ class ProjectDir():
                 num_files += 1
 
                 # Read the project file
-                project_file = ProjectFile(project_number, dir_entry.path)
+                project_data = BinaryFile.open_file(dir_entry.path)._data
             elif dir_entry.name == EFFECTS_FILE_NAME and not dir_entry.is_dir():
                 # Increment the number of files traversed
                 num_files += 1
 
                 # Read the effect file
-                effects_file = EffectsFile(dir_entry.path)
+                effects_data = BinaryFile.open_file(dir_entry.path)._data
             elif dir_entry.name == AUDIO_DIR_NAME and dir_entry.is_dir():
                 # Read the contents of this directory in
                 audio_files = listdir(dir_entry.path)
@@ -372,9 +402,21 @@ class ProjectDir():
                 num_files += len(audio_files)
 
         # If we don't have a project file, effects file and audio files array, then complain!
-        if not project_file or not effects_file: # or len(audio_files) == 0:
+        if project_data is None or effects_data is None: # or len(audio_files) == 0:
             raise InvalidProjectDirectory(dir_path, "Invalid project directory: missing project file, effects file or audio files!")
 
+        # Create an instance...
+        return ProjectDirContents(dir_path, project_number, project_data, effects_data, audio_files, num_files)
+
+    # Class level method to decode the contents of a project directory
+    @classmethod
+    def decode_contents(cls, contents):
+        # Decode the project file
+        project_file = ProjectFile(contents.project_number, contents.project_data)
+
+        # Decode the effect file
+        effects_file = EffectsFile(contents.effects_data)
+
         # Get the reverb number and name from the effects file
         (reverb_num, reverb_name) = effects_file.get_reverb_info()
 
@@ -385,7 +427,7 @@ class ProjectDir():
         project_file.set_send_effects(reverb_num, reverb_name, chorus_num, chorus_name)
 
         # Find the "extra" files that are not associated with tracks
-        extra_audio_files = [audio_file for audio_file in audio_files if not project_file.find_track("file_name", audio_file)]
+        extra_audio_files = [audio_file for audio_file in contents.audio_files if not project_file.find_track("file_name", audio_file)]
 
         # Is the master file in the list?
         if project_file.master.file in extra_audio_files:
@@ -395,7 +437,23 @@ class ProjectDir():
         project_file.set_extra_audio_files(extra_audio_files)
 
         # Create an instance...
-        return ProjectDir(project_file, effects_file, audio_files, num_files)
+        return ProjectDir(project_file, effects_file, contents.audio_files, contents.num_files)
+
+# Walk a card root, yielding each project directory path (in project number order)
+def find_project_dirs(card_root_str):
+    # Get the directory entry for this path
+    card_root = Path(card_root_str)
+
+    # If this is not a directory, then get out now...
+    if not card_root.exists() or not card_root.is_dir():
+        raise InvalidProjectDirectory(card_root, Template("Card directory does not exist: $card_root").substitute(card_root=card_root))
+
+    # Gather the names of the project directories (sorted by project number)
+    dir_names = sorted(dir_entry.name for dir_entry in scandir(card_root) if dir_entry.is_dir() and re.fullmatch(r'PROJ(\d{3})', dir_entry.name))
+
+    # Yield each one as a path
+    for dir_name in dir_names:
+        yield card_root / dir_name
 
 if __name__ == '__main__':
     # Look for command line argument of file name...
@@ -416,7 +474,7 @@ if __name__ == '__main__':
 
             # Diagnostics
             print(Template('OK [$num_files files in Project "$name"]').substitute(num_files=project_dir.num_files, name=project_file.project_name))
-        except InvalidProjectDirectory as ipd:
+        except (InvalidProjectDirectory, InvalidProjectFile) as ipd:
             # Diagnostics
             print(Template("Error [$message]").substitute(message=ipd.message))
 
@@ -1,7 +1,7 @@
 import sys
 import jsons
 from string import Template
-from generate_json import ProjectDir, InvalidProjectDirectory
+from generate_json import ProjectDir, InvalidProjectDirectory, InvalidProjectFile
 from merge_html import merge_json_and_template
 from util import status
 
@@ -27,7 +27,7 @@ if __name__ == '__main__':
 
             # Diagnostics
             print(Template('OK [$num_files files in Project "$name"]').substitute(num_files=project_dir.num_files, name=project_file.project_name))
-        except InvalidProjectDirectory as ipd:
+        except (InvalidProjectDirectory, InvalidProjectFile) as ipd:
             # Diagnostics
             print(Template("Error [$message]").substitute(message=ipd.message))
 
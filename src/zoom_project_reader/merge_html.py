@@ -1,27 +1,145 @@
 import json
 import sys
+from collections import OrderedDict
+from hashlib import sha1
 from string import Template
 from jinja2 import Environment, FileSystemLoader, select_autoescape, TemplateNotFound
+from markupsafe import Markup
 from util import status
 
+# Fragment templates (each is rendered on its own and can be cached)
+CHART_FRAGMENT = "fragments/chart.html"
+TOP_SECTION_FRAGMENT = "fragments/top_section.html"
+TRACK_ROW_FRAGMENT = "fragments/track_row.html"
+MASTER_ROW_FRAGMENT = "fragments/master_row.html"
+EXTRA_FILES_FRAGMENT = "fragments/extra_files.html"
+
+# Prefix for the name of a template with its fragments inlined (so it is rendered in a single pass)
+SINGLE_PASS_PREFIX = "single-pass:"
+
+# Where each fragment is placed in the chart (and what to inline there for a single pass)
+CHART_PLACEHOLDERS = [
+    ("{{ top_section }}", TOP_SECTION_FRAGMENT),
+    ("{% for track_row in track_rows %}", None),
+    ("{{ track_row }}", TRACK_ROW_FRAGMENT),
+    ("{{ master_row }}", MASTER_ROW_FRAGMENT),
+    ("{{ extra_files }}", EXTRA_FILES_FRAGMENT),
+]
+
+# Loads templates from a directory, inlining the chart's fragments for single pass templates
+class FragmentInliningLoader(FileSystemLoader):
+    # Get the source of a template (and a way to tell whether it is up to date)
+    def get_source(self, environment, template):
+        # An ordinary template?
+        if not template.startswith(SINGLE_PASS_PREFIX):
+            return super().get_source(environment, template)
+
+        # Load the page itself
+        (source, filename, uptodate) = super().get_source(environment, template[len(SINGLE_PASS_PREFIX):])
+        uptodates = [uptodate]
+
+        # Does it include the chart? If so, inline it (with its fragments)
+        chart_include = '{% include "' + CHART_FRAGMENT + '" %}'
+        if chart_include in source:
+            (chart_source, _, chart_uptodate) = super().get_source(environment, CHART_FRAGMENT)
+            uptodates.append(chart_uptodate)
+
+            for (placeholder, fragment_file) in CHART_PLACEHOLDERS:
+                # If the chart no longer has this placeholder, the inlined chart would quietly be wrong
+                if placeholder not in chart_source:
+                    raise Exception(Template('Unable to inline fragments: "$placeholder" not found in $chart').substitute(placeholder=placeholder, chart=CHART_FRAGMENT))
+
+                # The track rows loop over the tracks themselves
+                if fragment_file is None:
+                    chart_source = chart_source.replace(placeholder, "{% for ti in track_info %}")
+                    continue
+
+                (fragment_source, _, fragment_uptodate) = super().get_source(environment, fragment_file)
+                uptodates.append(fragment_uptodate)
+                chart_source = chart_source.replace(placeholder, fragment_source)
+
+            source = source.replace(chart_include, chart_source)
+
+        return (source, filename, lambda: all(uptodate() for uptodate in uptodates))
+
 # Our Jinja2 Environment
 env = Environment(
-    loader=FileSystemLoader("templates"),
+    loader=FragmentInliningLoader("templates"),
     autoescape=select_autoescape()
 )
 
-# Merge the objects together and return HTML text
-def merge_json_and_template(template_file, json_obj):
-    try:
-        # Load the template file
-        template = env.get_template(template_file)
+# The fields of the JSON object that feed the top section
+TOP_SECTION_FIELDS = ["card_name", "project_number", "project_name", "project_name_full",
+                      "reverb_number", "reverb_name", "chorus_number", "chorus_name"]
+
+# A (bounded) cache of rendered fragments, keyed by a hash of the data that feeds them
+class FragmentCache:
+    # Constructor
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
 
-        # Render the results
-        return template.render(json_obj)
+    # Return the rendered fragment for this context, rendering it only when not already cached
+    def render(self, template, context):
+        # Hash the data that feeds this fragment (the template itself is part of the key, so
+        # a template reloaded from disk never matches fragments rendered by its old version)
+        key = (template, sha1(json.dumps(context, sort_keys=True, default=str).encode("utf-8")).hexdigest())
+
+        # Do we already have it?
+        if key in self._fragments:
+            self.hits += 1
+            self._fragments.move_to_end(key)
+            return self._fragments[key]
+
+        # Render it (and remember it)
+        self.misses += 1
+        fragment = self._fragments[key] = Markup(template.render(context))
+
+        # Evict the least recently used fragment, if we have too many
+        if len(self._fragments) > self.max_entries:
+            self._fragments.popitem(last=False)
+
+        return fragment
+
+# Load a template, complaining if it cannot be found
+def get_template(template_file):
+    try:
+        return env.get_template(template_file)
     except TemplateNotFound as tnf:
         # Throw an exception
         raise Exception(Template("Unable to locate template: $msg").substitute(msg=tnf))
 
+# Render a single fragment (through the cache, if we have one)
+def render_fragment(template_file, context, fragment_cache=None):
+    # Load the fragment template
+    template = get_template(template_file)
+
+    # No cache? Just render it
+    if fragment_cache is None:
+        return Markup(template.render(context))
+
+    return fragment_cache.render(template, context)
+
+# Render each fragment of the chart from the JSON object
+def render_fragments(json_obj, fragment_cache=None):
+    return {
+        "top_section": render_fragment(TOP_SECTION_FRAGMENT, {field: json_obj.get(field, "") for field in TOP_SECTION_FIELDS}, fragment_cache),
+        "track_rows": [render_fragment(TRACK_ROW_FRAGMENT, {"ti": ti}, fragment_cache) for ti in json_obj.get("track_info", [])],
+        "master_row": render_fragment(MASTER_ROW_FRAGMENT, {"master": json_obj.get("master", {})}, fragment_cache),
+        "extra_files": render_fragment(EXTRA_FILES_FRAGMENT, {"extra_audio_files": json_obj.get("extra_audio_files", [])}, fragment_cache),
+    }
+
+# Merge the objects together and return HTML text (reusing any cached fragments)
+def merge_json_and_template(template_file, json_obj, fragment_cache=None):
+    # No cache? Render the page in a single pass (with its fragments inlined)
+    if fragment_cache is None:
+        return get_template(SINGLE_PASS_PREFIX + template_file).render(json_obj)
+
+    # Render the page from its fragments (the JSON object itself is still available to the template)
+    return get_template(template_file).render({**json_obj, **render_fragments(json_obj, fragment_cache)})
+
 if __name__ == "__main__":
     # Look for command line argument of file name...
     if len(sys.argv[1:]) < 3:
@@ -0,0 +1,132 @@
+import re
+import sys
+from pathlib import Path
+from string import Template
+import jsons
+from markupsafe import Markup
+from export_ndjson import read_projects
+from generate_json import find_project_dirs, InvalidProjectDirectory
+from merge_html import CHART_FRAGMENT, FragmentCache, get_template, render_fragments
+from util import status
+
+# Constants
+SONGBOOK_TEMPLATE_FILE = "songbook.html"
+STYLE_FILE = "static/style.css"
+ORDER_BY_NUMBER = "number"
+ORDER_BY_NAME = "name"
+
+# An entry in the table of contents (all we keep of each project while indexing the card)
+class ContentsEntry:
+    # Constructor
+    def __init__(self, project_dir_path, project_file):
+        self.project_dir_path = project_dir_path
+        self.project_number = project_file.project_number
+        self.project_name = project_file.project_name
+        self.project_name_full = project_file.project_name_full
+        self.card_name = project_file.card_name
+        self.saved = False
+
+    # The key used to order the songbook by name
+    def name_key(self):
+        return (self.project_name_full or self.project_name).casefold()
+
+# Read every project on the card once, keeping only its table of contents entry
+def index_card(card_dir, extra_json_dir, order):
+    # Each project file is discarded as soon as its entry is made
+    contents = [ContentsEntry(Path(card_dir) / ("PROJ" + project_file.project_number), project_file)
+                for project_file in read_projects(find_project_dirs(card_dir), extra_json_dir, sys.stdout)]
+
+    # Order by name (the project number breaks ties), if asked to
+    if order == ORDER_BY_NAME:
+        contents.sort(key=lambda entry: (entry.name_key(), entry.project_number))
+
+    return contents
+
+# Decode and render each project's section, one at a time (in table of contents order)
+def render_sections(contents, extra_json_dir):
+    # Fragments that repeat across charts (e.g. empty track rows) are only rendered once
+    fragment_cache = FragmentCache()
+    chart_template = get_template(CHART_FRAGMENT)
+
+    for entry in contents:
+        # The project is read again here, so it may fail (or be skipped) this time around
+        project_file = next(read_projects([entry.project_dir_path], extra_json_dir, sys.stdout), None)
+
+        # If so, keep the table of contents honest with a placeholder section
+        if project_file is None:
+            yield {"project_number": entry.project_number, "chart": None}
+            continue
+
+        # Generate the JSON object for the project
+        json_obj = jsons.dump(project_file, strip_privates=True)
+
+        entry.saved = True
+        yield {
+            "project_number": entry.project_number,
+            "chart": Markup(chart_template.render(render_fragments(json_obj, fragment_cache))),
+        }
+
+# Stream the songbook for a card to the output file, returning the number of projects saved
+def write_songbook(card_dir, extra_json_dir, output_file_name, order=ORDER_BY_NUMBER):
+    # Diagnostics
+    status(Template('Indexing "$card_dir"...\n').substitute(card_dir=card_dir))
+
+    # Build the table of contents
+    contents = index_card(card_dir, extra_json_dir, order)
+
+    # Use the first card name found in the extra info (or the card's directory name)
+    card_name = next((entry.card_name for entry in contents if entry.card_name), Path(card_dir).resolve().name)
+
+    # The style sheet is inlined once, for the whole songbook
+    with open(STYLE_FILE, "r", encoding="utf-8") as style_file:
+        style_css = Markup(style_file.read())
+
+    # Diagnostics
+    status('Rendering songbook...\n')
+
+    # Open the OUTPUT file for writing (only now that we know the card can be read)
+    with open(output_file_name, "w", encoding="utf-8") as output_file:
+        # Each section is written as soon as its project is decoded
+        get_template(SONGBOOK_TEMPLATE_FILE).stream(
+            card_name=card_name,
+            contents=contents,
+            sections=render_sections(contents, extra_json_dir),
+            style_css=style_css
+        ).dump(output_file)
+
+    return sum(1 for entry in contents if entry.saved)
+
+if __name__ == '__main__':
+    # Look for an (optional) order argument
+    order = ORDER_BY_NUMBER
+    args = []
+    for arg in sys.argv[1:]:
+        order_match = re.fullmatch(r'--order=(number|name)', arg)
+        if order_match is not None:
+            order = order_match.group(1)
+        else:
+            args.append(arg)
+
+    # Look for command line argument of file name...
+    if len(args) < 3:
+        # Status...
+        print("Missing arguments: [--order=number|name] CARD_DIR EXTRA_JSON_DIR OUTPUT_HTML_FILE")
+    else:
+        try:
+            # Write the songbook
+            num_projects = write_songbook(args[0], args[1], args[2], order)
+
+            # Diagnostics
+            print(Template('Saved $num_projects projects to "$output_file"').substitute(num_projects=num_projects, output_file=args[2]))
+        except InvalidProjectDirectory as ipd:
+            # Diagnostics
+            print(Template("Error [$message]").substitute(message=ipd.message))
+
+            # Exit with a failure
+            sys.exit(1)
+        except Exception as exp:
+            # Diagnostics
+            print(Template("Error [$message]").substitute(message=exp))
+
+            # Exit with a failure
+            sys.exit(1)
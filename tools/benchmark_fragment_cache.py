@@ -0,0 +1,68 @@
+import sys
+import copy
+from pathlib import Path
+from string import Template
+from timeit import timeit
+
+# Our scripts import each other by module name, so make them importable from here
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "zoom_project_reader"))
+
+import jsons
+from generate_json import ProjectDir
+from merge_html import FragmentCache, get_template, merge_json_and_template, render_fragments
+
+# Constants
+TEMPLATE_FILE = "template.html"
+DEFAULT_ITERATIONS = 1000
+
+# Render the page from its fragments, but without a cache (every fragment is rendered each time)
+def render_uncached_fragments(json_obj):
+    return get_template(TEMPLATE_FILE).render({**json_obj, **render_fragments(json_obj)})
+
+# Build one copy of the JSON object per iteration, each with a single (unique) fader change
+def make_fader_changes(json_obj, iterations):
+    json_objs = []
+    for i in range(iterations):
+        changed_obj = copy.deepcopy(json_obj)
+        changed_obj["track_info"][i % 16]["fader"] = 1000 + i
+        json_objs.append(changed_obj)
+
+    return json_objs
+
+# Format the time per page (in ms)
+def ms_per_page(secs, iterations):
+    return format(secs * 1000 / iterations, ".3f")
+
+if __name__ == '__main__':
+    # Look for command line argument of a project directory (run from the top of the repo)
+    if len(sys.argv[1:]) < 1:
+        print("Missing arguments: PROJECT_DIR [ITERATIONS]")
+        sys.exit(1)
+
+    iterations = int(sys.argv[2]) if len(sys.argv[1:]) > 1 else DEFAULT_ITERATIONS
+
+    # Load the project and generate its JSON object
+    project_dir = ProjectDir.read_directory(sys.argv[1])
+    json_obj = jsons.dump(project_dir.project_file, strip_privates=True)
+    json_objs = make_fader_changes(json_obj, iterations)
+
+    # Warm up (compile) every template before timing anything
+    merge_json_and_template(TEMPLATE_FILE, json_obj)
+    render_uncached_fragments(json_obj)
+    fragment_cache = FragmentCache()
+    merge_json_and_template(TEMPLATE_FILE, json_obj, fragment_cache)
+
+    # Reference: without a cache, the page is rendered in a single pass (its fragments inlined into one template)
+    monolithic_secs = timeit(lambda: [merge_json_and_template(TEMPLATE_FILE, obj) for obj in json_objs], number=1)
+
+    # Fragments, but no cache: every fragment of every page is rendered each time
+    fragment_secs = timeit(lambda: [render_uncached_fragments(obj) for obj in json_objs], number=1)
+
+    # Incremental render: only the row whose fader changed is re-rendered
+    cached_secs = timeit(lambda: [merge_json_and_template(TEMPLATE_FILE, obj, fragment_cache) for obj in json_objs], number=1)
+
+    # Report
+    print(Template("Single template:       $ms ms/page").substitute(ms=ms_per_page(monolithic_secs, iterations)))
+    print(Template("Fragments (no cache):  $ms ms/page").substitute(ms=ms_per_page(fragment_secs, iterations)))
+    print(Template("Incremental render:    $ms ms/page ($hits hits, $misses misses)").substitute(ms=ms_per_page(cached_secs, iterations), hits=fragment_cache.hits, misses=fragment_cache.misses))
+    print(Template("Speedup (vs single template): ${speedup}x").substitute(speedup=format(monolithic_secs / cached_secs, ".2f")))